@@ -1,26 +1,129 @@
-import os
-import json
-import tempfile
-
+import io
+import re
+import time
+import asyncio
+import sqlite3
+import hashlib
+import functools
+import threading
+import concurrent.futures
+from collections import OrderedDict
+
+import httpx
+import imagehash
+import numpy as np
+import orjson
+import pytesseract
 import streamlit as st
-import whisper
-import google.generativeai as genai
-
-API_KEY = st.secrets["API_KEY"]
+from PIL import Image
+from google import genai
+from google.genai import types
 
-genai.configure(api_key=API_KEY)
-model = genai.GenerativeModel("gemini-2.5-flash")
+from lexicon import classify_text
 
-headers = {
-    "authorization": API_KEY,
-    "content-type": "application/json"
-}
+API_KEY = st.secrets["API_KEY"]
 
 if not API_KEY:
     raise RuntimeError(
         "Please set GEMINI_API_KEY or GOOGLE_API_KEY environment variable."
     )
 
+MODEL_NAME = "gemini-2.5-flash"
+PROMPT_VERSION = "3"
+
+HTTP_TIMEOUT_MS = 30_000
+HTTP_LIMITS = httpx.Limits(max_keepalive_connections=8, keepalive_expiry=120)
+
+# How often the script thread checks for streamed fields while a request is running.
+PREVIEW_POLL_SECONDS = 0.05
+
+@st.cache_resource
+def get_client() -> genai.Client:
+    """
+    All requests go through client.aio, so its httpx pool is configured for
+    HTTP/2 and keep-alive: successive calls multiplex over one connection
+    instead of repeating the TCP and TLS handshakes. Passing an explicit httpx
+    transport also keeps google-genai from switching to aiohttp, which would
+    silently drop these settings, when aiohttp happens to be installed.
+    """
+    return genai.Client(
+        api_key=API_KEY,
+        http_options=types.HttpOptions(
+            timeout=HTTP_TIMEOUT_MS,
+            async_client_args={
+                "transport": httpx.AsyncHTTPTransport(http2=True, limits=HTTP_LIMITS),
+            },
+        ),
+    )
+
+client = get_client()
+
+@st.cache_resource
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """
+    A single event loop on a background thread, shared by all sessions. The
+    client's pooled connections are bound to the loop that opened them, so
+    running every request here lets them be reused across calls and reruns.
+    """
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return loop
+
+CACHE_TTL_SECONDS = 3600
+CACHE_MAX_ENTRIES = 1000
+
+EMBEDDING_MODEL = "gemini-embedding-001"
+SEMANTIC_CACHE_SIZE = 500
+SEMANTIC_CACHE_THRESHOLD = 0.95
+
+# Embeddings barely separate "X are good" from "X are not good", so a semantic
+# hit also requires both texts to contain the same negation words.
+NEGATION_PATTERN = re.compile(
+    r"\b(?:not|no|never|nor|none|nobody|nothing|neither|without|nahi|nahin|mat|\w+n['’]t)\b"
+)
+
+PERCEPTUAL_CACHE_SIZE = 500
+PERCEPTUAL_HASH_MAX_DISTANCE = 4
+
+# Uploads larger than this are downscaled and re-encoded before being sent to Gemini.
+IMAGE_RECOMPRESS_THRESHOLD = 256 * 1024
+IMAGE_MAX_SIDE = 1024
+IMAGE_JPEG_QUALITY = 85
+
+# Screenshots in which Tesseract finds no text at all are rated safe without a vision call.
+# Words read with at least OCR_MIN_CONFIDENCE are used to confirm perceptual-hash matches.
+OCR_MIN_CONFIDENCE = 60
+OCR_MAX_SIDE = 1600
+
+CACHE_DB_PATH = "cache.db"
+PERSISTENT_CACHE_TTL_SECONDS = 7 * 24 * 3600
+PERSISTENT_CACHE_MAX_ENTRIES = 10000
+
+# Inputs that depend on the current time or context are never served from cache.
+NO_CACHE_PATTERN = re.compile(
+    r"\b(now|today|tonight|tomorrow|yesterday|currently|latest|this (?:week|month|year))\b",
+    re.IGNORECASE,
+)
+
+LEVEL_DISPLAY = {
+    "low": "🟢 Low",
+    "medium": "🟡 Medium",
+    "high": "🟠 High",
+    "critical": "🔴 Critical",
+}
+
+# Fields that can be shown before the full JSON response has arrived.
+RISK_SCORE_PATTERN = re.compile(r'"risk_score"\s*:\s*(-?\d+(?:\.\d+)?)\s*[,}]')
+RISK_LEVEL_PATTERN = re.compile(r'"risk_level"\s*:\s*"(\w+)"')
+
+SAFE_RESULT = {
+    "risk_score": 0,
+    "risk_level": "low",
+    "categories": [],
+    "explanations": ["A simple greeting or pleasantry with nothing sensitive in it."],
+    "suggested_rewrites": [],
+}
+
 RISK_SCHEMA = {
     "type": "OBJECT",
     "properties": {
@@ -50,17 +153,36 @@ RISK_SCHEMA = {
         },
     },
     "required": ["risk_score", "risk_level", "suggested_rewrites"],
+    # Emit the score first so the streaming preview can show it early.
+    "propertyOrdering": [
+        "risk_score", "risk_level", "categories", "explanations", "suggested_rewrites",
+    ],
 }
 
-def call_gemini_for_text(text: str) -> dict:
-    """
-    Send raw text to Gemini and get back a structured JSON response
-    containing risk_score, risk_level, categories, explanations, suggested_rewrites.
-    """
-    if not text or not text.strip():
-        return None
+# Default for text: only what is shown above the fold. Rewrites are requested on demand.
+RISK_SCHEMA_LIGHT = {
+    "type": "OBJECT",
+    "properties": {
+        "risk_score": RISK_SCHEMA["properties"]["risk_score"],
+        "risk_level": RISK_SCHEMA["properties"]["risk_level"],
+        "categories": RISK_SCHEMA["properties"]["categories"],
+    },
+    "required": ["risk_score", "risk_level", "categories"],
+    "propertyOrdering": ["risk_score", "risk_level", "categories"],
+}
+
+# Fetched on demand for text: the parts of RISK_SCHEMA left out of RISK_SCHEMA_LIGHT.
+REWRITE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "explanations": RISK_SCHEMA["properties"]["explanations"],
+        "suggested_rewrites": RISK_SCHEMA["properties"]["suggested_rewrites"],
+    },
+    "required": ["explanations", "suggested_rewrites"],
+    "propertyOrdering": ["explanations", "suggested_rewrites"],
+}
 
-    prompt = f"""
+TEXT_PROMPT_TEMPLATE = """
 You are an AI ethics and safety assistant for social media, especially in diverse and sensitive contexts
 like India and other multicultural societies.
 
@@ -77,42 +199,14 @@ Definitions:
 - "risk_score": number 0–100. 0 means totally safe; 100 means extremely harmful.
 - "risk_level": one of ["low", "medium", "high", "critical"].
 - "categories": list of short labels, e.g. ["religion", "caste", "bullying"].
-- "explanations": list of short bullet-point style sentences explaining your reasoning.
-- "suggested_rewrites": list of alternative messages that keep the user's intent,
-  but are more polite, respectful, and unlikely to hurt anyone's sentiments.
-
-Very important:
-- DO NOT invent new slurs or extra offensive content.
-- DO NOT make the message harsher or more extreme.
-- Focus on de-escalation, empathy, and respectful communication.
 
 Now analyse this text and fill the JSON fields:
 
 USER_TEXT:
-\"\"\"{text.strip()}\"\"\"
+\"\"\"{text}\"\"\"
 """
 
-    response = model.generate_content(
-        prompt,
-        generation_config={"response_mime_type": "application/json"}
-    )
-
-    return json.loads(response.text)
-
-def call_gemini_for_image(image_bytes: bytes, mime_type: str = "image/png") -> dict:
-    """
-    Analyse an uploaded image (e.g., screenshot of a comment section) and return
-    the same JSON structure: risk_score, risk_level, categories, explanations, suggested_rewrites.
-    """
-    if not image_bytes:
-        return None
-
-    image_part = types.Part.from_bytes(
-        data=image_bytes,
-        mime_type=mime_type or "image/png",
-    )
-
-    prompt = """
+IMAGE_PROMPT = """
 You are an AI ethics and safety assistant for social media screenshots.
 
 Steps:
@@ -134,43 +228,543 @@ Return a single JSON object with:
 Do NOT output anything except the JSON object.
 """
 
-    response = model.generate_content(
-        [
-            {"mime_type": mime_type, "data": image_bytes},
-            IMAGE_PROMPT
-        ]
+AUDIO_PROMPT = """
+You are an AI ethics and safety assistant for social media voice notes.
+
+Steps:
+1. Listen to the recording and transcribe what is said.
+2. Pay attention to how it is said as well: tone, sarcasm, shouting or mocking delivery.
+3. Evaluate the overall risk that the message could hurt someone's cultural, religious,
+   caste, gender, regional or personal sentiments, or contain harassment, bullying,
+   hate speech, or incitement.
+
+Return a single JSON object with:
+- "risk_score": number 0–100 (0 = safe, 100 = extremely harmful)
+- "risk_level": one of ["low", "medium", "high", "critical"]
+- "categories": list of short labels (e.g. ["religion", "caste", "bullying", "aggressive_tone"])
+- "explanations": list of short sentences explaining the main concerns, including tone
+- "suggested_rewrites": list of more respectful and polite ways to say the same message,
+  while keeping the core meaning where possible.
+
+Do NOT output anything except the JSON object.
+"""
+
+REWRITE_PROMPT_TEMPLATE = """
+You are an AI ethics and safety assistant for social media.
+
+Rewrite the user text below into alternative messages that keep the user's intent,
+but are more polite, respectful, and unlikely to hurt anyone's sentiments.
+
+Very important:
+- DO NOT repeat any slurs or invent new offensive content.
+- If the text is only an insult, redirect it: suggest ways to express the underlying
+  disagreement or frustration constructively instead.
+- Focus on de-escalation, empathy, and respectful communication.
+
+Return a single JSON object with:
+- "explanations": list of short bullet-point style sentences explaining why the original
+  text might be risky or hurtful, or why it is fine.
+- "suggested_rewrites": list of alternative messages.
+
+USER_TEXT:
+\"\"\"{text}\"\"\"
+"""
+
+def run_async(coro, progress: dict = None):
+    """
+    Run coro on the shared event loop and wait for its result. While waiting,
+    the risk score and level that the coroutine records in progress are shown
+    in a placeholder, since Streamlit elements can only be updated from the
+    script thread. If the script stops waiting (for example on a rerun), the
+    coroutine is cancelled so it does not keep streaming in the background.
+    """
+    future = asyncio.run_coroutine_threadsafe(coro, get_event_loop())
+
+    try:
+        if progress is None:
+            return future.result()
+        return wait_with_preview(future, progress)
+    except BaseException:
+        future.cancel()
+        raise
+
+def wait_with_preview(future: concurrent.futures.Future, progress: dict):
+    preview = st.empty()
+    shown = None
+
+    try:
+        while True:
+            try:
+                return future.result(timeout=PREVIEW_POLL_SECONDS)
+            except concurrent.futures.TimeoutError:
+                pass
+
+            risk_score = progress.get("risk_score")
+            risk_level = progress.get("risk_level")
+            if risk_score is None or (risk_score, risk_level) == shown:
+                continue
+
+            shown = (risk_score, risk_level)
+            with preview.container():
+                st.metric("Risk score (0–100)", value=risk_score)
+                if risk_level:
+                    st.write("*Risk level:*", LEVEL_DISPLAY.get(risk_level, risk_level))
+    finally:
+        preview.empty()
+
+async def generate_json_streamed(contents, schema: dict, progress: dict = None) -> dict:
+    """
+    Stream a JSON response from Gemini and return the parsed object. The risk
+    score and level are recorded in progress as soon as they appear in the
+    partial output, while the remaining fields are still being generated.
+    """
+    chunks = []
+
+    stream = await client.aio.models.generate_content_stream(
+        model=MODEL_NAME,
+        contents=contents,
+        config=types.GenerateContentConfig(
+            response_mime_type="application/json",
+            response_schema=schema,
+        ),
     )
+    async for chunk in stream:
+        chunks.append(chunk.text or "")
+        if progress is None or ("risk_score" in progress and "risk_level" in progress):
+            continue
 
-    return json.loads(response.text)
+        partial = "".join(chunks)
+        if "risk_score" not in progress and (match := RISK_SCORE_PATTERN.search(partial)):
+            progress["risk_score"] = int(round(float(match.group(1))))
+        if "risk_level" not in progress and (match := RISK_LEVEL_PATTERN.search(partial)):
+            progress["risk_level"] = match.group(1).lower()
+
+    return orjson.loads("".join(chunks))
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.lower().split())
+
+def make_cache_key(data: bytes) -> str:
+    """
+    SHA-256 of the input bytes, salted with the model name and prompt version
+    so that changing either invalidates previously cached results.
+    """
+    digest = hashlib.sha256(data)
+    digest.update(f"|{MODEL_NAME}|{PROMPT_VERSION}".encode())
+    return digest.hexdigest()
+
+class SemanticCache:
+    """
+    Bounded LRU store of (embedding, negations, result) entries. A lookup returns
+    the result of the most similar stored query with the same negation words when
+    its cosine similarity exceeds the threshold. Embeddings are expected to be
+    unit-normalised.
+    """
+
+    def __init__(self, max_entries: int, threshold: float):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.entries = OrderedDict()
+        self.keys = []
+        self.matrix = None
+        self.lock = threading.Lock()
+
+    def lookup(self, embedding: np.ndarray, negations: frozenset) -> dict:
+        with self.lock:
+            if not self.entries:
+                return None
+
+            if self.matrix is None:
+                self.keys = list(self.entries)
+                self.matrix = np.stack([self.entries[k][0] for k in self.keys])
+
+            same_negations = np.array([self.entries[k][1] == negations for k in self.keys])
+            scores = np.where(same_negations, self.matrix @ embedding, -1.0)
+            best = int(np.argmax(scores))
+            if scores[best] <= self.threshold:
+                return None
+
+            key = self.keys[best]
+            self.entries.move_to_end(key)
+            return self.entries[key][2]
+
+    def add(self, key: str, embedding: np.ndarray, negations: frozenset, result: dict):
+        with self.lock:
+            self.entries[key] = (embedding, negations, result)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self.matrix = None
+
+def negation_words(text: str) -> frozenset:
+    return frozenset(NEGATION_PATTERN.findall(normalize_text(text)))
 
 @st.cache_resource
-def load_whisper_model():
-    return whisper.load_model("base")
+def get_semantic_cache() -> SemanticCache:
+    return SemanticCache(SEMANTIC_CACHE_SIZE, SEMANTIC_CACHE_THRESHOLD)
+
+class PerceptualCache:
+    """
+    Bounded LRU store of (64-bit perceptual hash, OCR text, result) entries. A
+    lookup returns the result of the closest stored image whose OCR text is
+    identical, when its Hamming distance is within max_distance. pHash alone
+    discards the fine detail comment text lives in, so two screenshots of the
+    same layout with different comments can be only a few bits apart; the hash
+    only nominates candidates and the text confirms them.
+    """
 
-whisper_model = load_whisper_model()
+    def __init__(self, max_entries: int, max_distance: int):
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.entries = OrderedDict()
+        self.keys = []
+        self.hashes = None
+        self.lock = threading.Lock()
+
+    def lookup(self, image_hash: int, image_text: str) -> dict:
+        with self.lock:
+            if not self.entries:
+                return None
+
+            if self.hashes is None:
+                self.keys = list(self.entries)
+                self.hashes = np.array([self.entries[k][0] for k in self.keys], dtype=np.uint64)
+
+            diff = self.hashes ^ np.uint64(image_hash)
+            distances = np.unpackbits(diff.view(np.uint8)).reshape(len(diff), 64).sum(axis=1)
+            same_text = np.array([self.entries[k][1] == image_text for k in self.keys])
+            distances = np.where(same_text, distances, 65)
+            best = int(np.argmin(distances))
+            if distances[best] > self.max_distance:
+                return None
+
+            key = self.keys[best]
+            self.entries.move_to_end(key)
+            return self.entries[key][2]
+
+    def add(self, key: str, image_hash: int, image_text: str, result: dict):
+        with self.lock:
+            self.entries[key] = (image_hash, image_text, result)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self.hashes = None
 
-def transcribe_audio(audio_bytes: bytes) -> str:
-    if not audio_bytes:
-        return ""
+@st.cache_resource
+def get_perceptual_cache() -> PerceptualCache:
+    return PerceptualCache(PERCEPTUAL_CACHE_SIZE, PERCEPTUAL_HASH_MAX_DISTANCE)
+
+def perceptual_hash(image_bytes: bytes) -> int:
+    return int(str(imagehash.phash(Image.open(io.BytesIO(image_bytes)))), 16)
+
+class PersistentCache:
+    """
+    SQLite-backed response store that survives restarts. Entries expire after
+    ttl seconds, and the least recently used ones are evicted beyond max_entries.
+    """
+
+    def __init__(self, path: str, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+
+        with self.lock, self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, response BLOB, created REAL, last_used REAL)"
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)"
+            )
+
+    def get(self, key: str):
+        now = time.time()
+        with self.lock, self.conn:
+            row = self.conn.execute(
+                "SELECT response FROM responses WHERE key = ? AND created >= ?",
+                (key, now - self.ttl),
+            ).fetchone()
+            if row is None:
+                return None
+
+            self.conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+
+        return orjson.loads(row[0])
+
+    def put(self, key: str, response):
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (key, orjson.dumps(response), now, now),
+            )
+            self.conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+            self.conn.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+@st.cache_resource
+def get_persistent_cache() -> PersistentCache:
+    return PersistentCache(CACHE_DB_PATH, PERSISTENT_CACHE_TTL_SECONDS, PERSISTENT_CACHE_MAX_ENTRIES)
+
+def persistently_cached(func):
+    """
+    Check the SQLite cache before calling func(cache_key, ...) and store its
+    result afterwards. func returns (result, persist); persist is False for
+    results borrowed from a similar input, which must not be stored under this
+    input's key. Keys are namespaced by function name.
+    """
+    @functools.wraps(func)
+    def wrapper(cache_key: str, *args):
+        persistent_cache = get_persistent_cache()
+        key = f"{func.__name__}:{cache_key}"
+
+        result = persistent_cache.get(key)
+        if result is None:
+            result, persist = func(cache_key, *args)
+            if persist and result is not None:
+                persistent_cache.put(key, result)
 
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
-        tmp.write(audio_bytes)
-        tmp_path = tmp.name
+        return result
+
+    return wrapper
+
+async def embed_text_async(text: str) -> np.ndarray:
+    result = await client.aio.models.embed_content(model=EMBEDDING_MODEL, contents=text)
+    vector = np.asarray(result.embeddings[0].values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+def prefilter_text(text: str) -> dict:
+    """
+    Decide obvious cases without a full Gemini analysis: texts made up only of
+    allow-listed greetings are safe, and texts containing a known slur are critical
+    (only the rewrites are requested from Gemini). Returns None otherwise.
+    """
+    verdict = classify_text(text)
+
+    if verdict == "critical":
+        try:
+            rewrites = call_gemini_for_rewrites(text)["suggested_rewrites"]
+        except Exception:
+            rewrites = []
+
+        return {
+            "risk_score": 100,
+            "risk_level": "critical",
+            "categories": ["slur"],
+            "explanations": ["The text contains a slur that is hurtful in any context."],
+            "suggested_rewrites": rewrites,
+        }
+
+    if verdict == "safe":
+        return dict(SAFE_RESULT)
+
+    return None
+
+def call_gemini_for_text(text: str) -> dict:
+    """
+    Send raw text to Gemini and get back a structured JSON response
+    containing risk_score, risk_level and categories (see call_gemini_for_rewrites).
+    Identical inputs (ignoring case and whitespace) are served from cache, and
+    near-duplicates are matched by embedding similarity.
+    """
+    if not text or not text.strip():
+        return None
+
+    result = prefilter_text(text)
+    if result is not None:
+        return result
+
+    if NO_CACHE_PATTERN.search(text):
+        return analyse_text(text)
+
+    cache_key = make_cache_key(normalize_text(text).encode())
+    return cached_text_analysis(cache_key, text)
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+@persistently_cached
+def cached_text_analysis(cache_key: str, _text: str) -> tuple:
+    progress = {}
+    coro = semantic_text_analysis(cache_key, _text, get_semantic_cache(), progress)
+    return run_async(coro, progress)
+
+async def semantic_text_analysis(
+    cache_key: str, text: str, semantic_cache: SemanticCache, progress: dict
+) -> tuple:
+    """
+    Start the Gemini analysis and the embedding lookup concurrently, so a
+    semantic-cache miss does not pay for the embedding round-trip on top of
+    the analysis. On a hit the in-flight analysis is cancelled. If the embedding
+    request fails, the analysis result is returned without touching the cache.
+    Returns (result, persist), where persist is False for semantic hits.
+    """
+    analysis = asyncio.create_task(analyse_text_async(text, progress))
+    negations = negation_words(text)
 
     try:
-        result = whisper_model.transcribe(tmp_path)
-        return result.get("text", "").strip()
+        try:
+            embedding = await embed_text_async(normalize_text(text))
+            result = semantic_cache.lookup(embedding, negations)
+        except Exception:
+            return await analysis, True
+
+        if result is not None:
+            return result, False
+
+        result = await analysis
+        semantic_cache.add(cache_key, embedding, negations, result)
+        return result, True
     finally:
-        os.remove(tmp_path)
+        analysis.cancel()
+
+def analyse_text(text: str) -> dict:
+    progress = {}
+    return run_async(analyse_text_async(text, progress), progress)
 
-def call_gemini_for_audio(audio_bytes: bytes) -> dict:
-    transcript = transcribe_audio(audio_bytes)
+async def analyse_text_async(text: str, progress: dict = None) -> dict:
+    prompt = TEXT_PROMPT_TEMPLATE.format(text=text.strip())
+    return await generate_json_streamed(prompt, RISK_SCHEMA_LIGHT, progress)
 
-    if not transcript:
+def call_gemini_for_rewrites(text: str) -> dict:
+    """
+    Ask Gemini for the explanations and respectful rewrites of the text that the
+    light text analysis leaves out, without repeating the risk scoring.
+    """
+    if not text or not text.strip():
+        return {"explanations": [], "suggested_rewrites": []}
+
+    cache_key = make_cache_key(normalize_text(text).encode())
+    return cached_rewrites(cache_key, text)
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+@persistently_cached
+def cached_rewrites(cache_key: str, _text: str) -> tuple:
+    prompt = REWRITE_PROMPT_TEMPLATE.format(text=_text.strip())
+    result = run_async(generate_json_streamed(prompt, REWRITE_SCHEMA))
+    details = {
+        "explanations": result.get("explanations") or [],
+        "suggested_rewrites": result.get("suggested_rewrites") or [],
+    }
+    return details, True
+
+def call_gemini_for_image(image_bytes: bytes, mime_type: str = "image/png") -> dict:
+    """
+    Analyse an uploaded image (e.g., screenshot of a comment section) and return
+    the same JSON structure: risk_score, risk_level, categories, explanations, suggested_rewrites.
+    Byte-identical uploads are served from cache, and re-uploads of the same
+    screenshot are matched by perceptual hash, confirmed by identical OCR text.
+    """
+    if not image_bytes:
         return None
 
-    st.info(f"Transcribed: {transcript}")
-    return call_gemini_for_text(transcript)
+    return cached_image_analysis(make_cache_key(image_bytes), image_bytes, mime_type)
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+@persistently_cached
+def cached_image_analysis(cache_key: str, _image_bytes: bytes, mime_type: str) -> tuple:
+    image_hash = perceptual_hash(_image_bytes)
+    words = read_image_words(_image_bytes)
+    image_text = None
+    if words is not None:
+        image_text = " ".join(word for word, conf in words if conf >= OCR_MIN_CONFIDENCE)
+    perceptual_cache = get_perceptual_cache()
+
+    # Without OCR there is nothing to confirm a pHash candidate with, so only the
+    # exact-hash caches apply. Near hits are never persisted under this image's key.
+    if image_text is not None:
+        result = perceptual_cache.lookup(image_hash, normalize_text(image_text))
+        if result is not None:
+            return result, False
+
+    # Only skip Gemini when Tesseract finds no text at all. Low-confidence output is
+    # not evidence of safety: Indic scripts and stylised meme fonts read as noise.
+    if words is not None and not words:
+        result = {
+            **SAFE_RESULT,
+            "explanations": ["No readable text was found in the image."],
+        }
+    else:
+        # Resize on the script thread, not inside the coroutine on the shared event loop.
+        image_bytes, mime_type = shrink_image(_image_bytes, mime_type)
+        progress = {}
+        result = run_async(analyse_image_async(image_bytes, mime_type, progress), progress)
+
+    if image_text is not None:
+        perceptual_cache.add(cache_key, image_hash, normalize_text(image_text), result)
+    return result, True
+
+def read_image_words(image_bytes: bytes) -> list:
+    """
+    Read the text in an image with Tesseract and return (word, confidence) pairs
+    for every word found, at any confidence. The image is first downscaled to
+    OCR_MAX_SIDE so the gate stays cheaper than the vision call it is meant to
+    skip. Returns None when Tesseract is missing or fails, in which case the
+    image always gets the full Gemini analysis.
+    """
+    img = Image.open(io.BytesIO(image_bytes))
+    img.thumbnail((OCR_MAX_SIDE, OCR_MAX_SIDE), Image.LANCZOS)
+
+    try:
+        data = pytesseract.image_to_data(img, output_type=pytesseract.Output.DICT)
+    except (pytesseract.TesseractNotFoundError, pytesseract.TesseractError):
+        return None
+
+    return [
+        (word.strip(), float(conf))
+        for word, conf in zip(data["text"], data["conf"])
+        if word.strip()
+    ]
+
+def shrink_image(image_bytes: bytes, mime_type: str) -> tuple:
+    """
+    Downscale large uploads so the longest side is at most IMAGE_MAX_SIDE and
+    re-encode them as JPEG, which keeps comment text legible while cutting upload
+    size and vision tokens. Small images are returned unchanged.
+    """
+    if len(image_bytes) <= IMAGE_RECOMPRESS_THRESHOLD:
+        return image_bytes, mime_type
+
+    img = Image.open(io.BytesIO(image_bytes))
+    img.thumbnail((IMAGE_MAX_SIDE, IMAGE_MAX_SIDE), Image.LANCZOS)
+
+    buf = io.BytesIO()
+    img.convert("RGB").save(buf, format="JPEG", quality=IMAGE_JPEG_QUALITY)
+    return buf.getvalue(), "image/jpeg"
+
+async def analyse_image_async(image_bytes: bytes, mime_type: str, progress: dict = None) -> dict:
+    image_part = types.Part.from_bytes(
+        data=image_bytes,
+        mime_type=mime_type or "image/png",
+    )
+
+    return await generate_json_streamed([image_part, IMAGE_PROMPT], RISK_SCHEMA, progress)
+
+def call_gemini_for_audio(audio_bytes: bytes, mime_type: str = "audio/wav") -> dict:
+    """
+    Analyse a recorded voice note, taking both the words and the tone into account,
+    and return the same JSON structure as the text and image analyses.
+    """
+    if not audio_bytes:
+        return None
+
+    return cached_audio_analysis(make_cache_key(audio_bytes), audio_bytes, mime_type)
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+@persistently_cached
+def cached_audio_analysis(cache_key: str, _audio_bytes: bytes, mime_type: str) -> tuple:
+    progress = {}
+    return run_async(analyse_audio_async(_audio_bytes, mime_type, progress), progress), True
+
+async def analyse_audio_async(audio_bytes: bytes, mime_type: str, progress: dict = None) -> dict:
+    audio_part = types.Part.from_bytes(
+        data=audio_bytes,
+        mime_type=mime_type or "audio/wav",
+    )
+
+    return await generate_json_streamed([audio_part, AUDIO_PROMPT], RISK_SCHEMA, progress)
 
 
 def render_risk_box(data: dict):
@@ -178,34 +772,32 @@ def render_risk_box(data: dict):
         st.warning("No analysis result available.")
         return
 
-    risk_score = int(round(data.get("risk_score", 0)))
+    risk_score = max(0, min(100, int(round(data.get("risk_score") or 0))))
     risk_level = (data.get("risk_level") or "low").lower()
 
-    level_display = {
-        "low": "🟢 Low",
-        "medium": "🟡 Medium",
-        "high": "🟠 High",
-        "critical": "🔴 Critical",
-    }.get(risk_level, risk_level)
+    level_display = LEVEL_DISPLAY.get(risk_level, risk_level)
 
     st.subheader("Overall Risk Assessment")
     st.metric("Risk score (0–100)", value=risk_score)
-    st.progress(min(max(risk_score, 0), 100))
+    st.progress(risk_score)
 
     st.write("*Risk level:*", level_display)
 
     categories = data.get("categories") or []
     if categories:
         st.write("*Categories detected:*")
-        st.write(", ".join(f"{c}" for c in categories))
+        st.write(", ".join(map(str, categories)))
 
-    explanations = data.get("explanations") or []
+    render_explanations(data.get("explanations") or [])
+    render_rewrites(data.get("suggested_rewrites") or [])
+
+def render_explanations(explanations: list):
     if explanations:
         st.write("*Why this might be risky / safe:*")
         for e in explanations:
             st.markdown(f"- {e}")
 
-    rewrites = data.get("suggested_rewrites") or []
+def render_rewrites(rewrites: list):
     if rewrites:
         st.subheader("Polite & respectful suggestions")
         for i, alt in enumerate(rewrites, start=1):
@@ -227,7 +819,8 @@ tab_text, tab_image, tab_audio = st.tabs(
     ["Text input", "Image Input", "Voice Input"]
 )
 
-with tab_text:
+@st.fragment
+def text_tab():
     st.subheader("Analyse a text comment or post")
 
     user_text = st.text_area(
@@ -246,12 +839,33 @@ with tab_text:
         else:
             with st.spinner("Analysing Text..."):
                 try:
-                    result = call_gemini_for_text(user_text)
-                    render_risk_box(result)
+                    st.session_state.last_text = user_text
+                    st.session_state.last_text_result = call_gemini_for_text(user_text)
                 except Exception as e:
+                    st.session_state.last_text_result = None
                     st.error(f"Error while analysing text: {e}")
 
-with tab_image:
+    text_result = st.session_state.get("last_text_result")
+    if text_result:
+        render_risk_box(text_result)
+
+        # Results settled locally by the lexicon pre-filter have nothing to expand on.
+        if (
+            not text_result.get("suggested_rewrites")
+            and classify_text(st.session_state.last_text) is None
+            and st.button("Explain and suggest respectful rewrites")
+        ):
+            with st.spinner("Generating rewrites..."):
+                try:
+                    details = call_gemini_for_rewrites(st.session_state.last_text)
+                    text_result.update(details)
+                    render_explanations(details["explanations"])
+                    render_rewrites(details["suggested_rewrites"])
+                except Exception as e:
+                    st.error(f"Error while generating rewrites: {e}")
+
+@st.fragment
+def image_tab():
     st.subheader("Upload a screenshot of a comment section")
 
     uploaded_file = st.file_uploader(
@@ -274,7 +888,8 @@ with tab_image:
             except Exception as e:
                 st.error(f"Error while analysing image: {e}")
 
-with tab_audio:
+@st.fragment
+def audio_tab():
     st.subheader("Speak and get a live risk analysis")
 
     st.write(
@@ -291,19 +906,19 @@ with tab_audio:
     if audio_value:
         st.audio(audio_value)
 
-        if "last_audio_size" not in st.session_state:
-            st.session_state.last_audio_size = None
+        if "last_audio_key" not in st.session_state:
+            st.session_state.last_audio_key = None
 
-        current_size = len(audio_value.getvalue())
+        audio_bytes = audio_value.getvalue()
+        audio_key = hashlib.blake2b(audio_bytes, digest_size=16).hexdigest()
 
-        if st.session_state.last_audio_size != current_size:
+        if st.session_state.last_audio_key != audio_key:
             with st.spinner("Analysing Voice..."):
                 try:
-                    audio_bytes = audio_value.read()
                     mime_type = audio_value.type or "audio/wav"
 
-                    result = call_gemini_for_audio(audio_bytes)
-                    st.session_state.last_audio_size = current_size
+                    result = call_gemini_for_audio(audio_bytes, mime_type)
+                    st.session_state.last_audio_key = audio_key
                     st.session_state.last_audio_result = result
                 except Exception as e:
                     st.error(f"Error while analysing audio: {e}")
@@ -314,4 +929,11 @@ with tab_audio:
 
             st.info("Record a short message to see the risk analysis here.")
 
+with tab_text:
+    text_tab()
+
+with tab_image:
+    image_tab()
 
+with tab_audio:
+    audio_tab()
@@ -0,0 +1,45 @@
+"""
+Word lists used by SafeSpeak_AI.prefilter_text to settle obvious text inputs
+without calling Gemini. Kept free of Streamlit so it can be tested on its own.
+"""
+import re
+
+# Texts made up only of these greetings and pleasantries are rated safe without calling
+# Gemini. A lexicon cannot prove arbitrary text is harmless, so everything else goes to the model.
+SAFE_PHRASES = (
+    "hi", "hello", "hey", "namaste", "namaskar", "sat sri akal", "salaam", "vanakkam",
+    "good morning", "good afternoon", "good evening", "good night",
+    "thanks", "thank you", "thank you so much", "ok", "okay", "bye", "see you",
+    "congrats", "congratulations", "happy birthday", "welcome", "well done", "good job",
+    "have a nice day",
+)
+
+# Slurs with no innocent sense in any common language: the text is rated critical
+# locally and Gemini is only asked for rewrites. Words that are also community or
+# place names, ordinary words elsewhere, or slang for something else are left to the model.
+CRITICAL_TERMS = (
+    "nigger", "kike", "katua", "chinki",
+)
+
+SAFE_PATTERN = re.compile(
+    r"(?:(?:" + "|".join(map(re.escape, SAFE_PHRASES)) + r")[\s,.!?]*)+",
+    re.IGNORECASE,
+)
+
+CRITICAL_PATTERN = re.compile(
+    r"\b(?:" + "|".join(map(re.escape, CRITICAL_TERMS)) + r")s?\b",
+    re.IGNORECASE,
+)
+
+def classify_text(text: str) -> str:
+    """
+    Return "critical" if the text contains a known slur, "safe" if it consists
+    only of allow-listed greetings, and None if it needs a full analysis.
+    """
+    if CRITICAL_PATTERN.search(text):
+        return "critical"
+
+    if SAFE_PATTERN.fullmatch(text.strip()):
+        return "safe"
+
+    return None
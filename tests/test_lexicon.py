@@ -0,0 +1,49 @@
+import pytest
+
+from lexicon import classify_text
+
+
+@pytest.mark.parametrize("text", [
+    "hello",
+    "Hello!",
+    "good morning, thank you!",
+    "  namaste  ",
+    "okay bye",
+])
+def test_greetings_are_safe(text):
+    assert classify_text(text) == "safe"
+
+
+@pytest.mark.parametrize("text", [
+    "you're a retard",
+    "chamar",
+    "chutiya",
+    "shut up bhenchod",
+    "go to hell",
+    "kys",
+    "hi idiot",
+    "hello, people from X are not welcome here",
+])
+def test_abuse_outside_lexicon_goes_to_model(text):
+    assert classify_text(text) is None
+
+
+@pytest.mark.parametrize("text", [
+    "Ci vediamo sulla piazza",
+    "Anna se mulle",
+    "We drove through Katwe",
+    "The tranny on my car is slipping",
+    "a chink in the armour",
+    "Mummy ne baal katwa diye",
+    "faggots for dinner tonight",
+])
+def test_words_with_innocent_senses_are_not_critical(text):
+    assert classify_text(text) != "critical"
+
+
+@pytest.mark.parametrize("text", [
+    "all katuas should leave",
+    "go home, Chinki",
+])
+def test_known_slurs_are_critical(text):
+    assert classify_text(text) == "critical"